@@ -1,124 +1,321 @@
 # server.py
-# Requires: pip install flask flask-cors
+# Requires: pip install flask flask-cors gunicorn orjson inotify_simple
+#
+# Run (multi-process, multi-threaded WSGI):
+#   gunicorn -w 4 -k gthread --threads 8 -b 0.0.0.0:8000 server:app
+# Each open /api/inbox_stream holds one worker thread, so streams are capped
+# at INBOX_STREAM_MAX per worker; keep --threads above that cap.
 #
 # This is a disposable email service API that talks to a toy SMTP server
-# implemented in C++ on 127.0.0.1:2525. It:
+# implemented in C++ on 127.0.0.1:2525 (or a Unix socket, if configured via
+# the SMTP_SERVER_SOCKET environment variable). It:
 #   - Creates random disposable email addresses
 #   - Sends mail via SMTP to the C++ server
 #   - Reads .eml files from a spool directory and exposes them as JSON
 
 import os
-import glob
+import re
+import logging
+import queue
 import socket
-import uuid
-
-from flask import Flask, request, jsonify
+import time
+import secrets
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import orjson
+from flask import Flask, Response, request
 from flask_cors import CORS
 
 from email.message import EmailMessage
-from email.utils import formatdate, make_msgid
+from email.utils import format_datetime
 from email import policy
-from email.parser import BytesParser
+from email.parser import BytesParser, BytesHeaderParser
+
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:  # non-Linux: inbox falls back to scanning on every poll
+    INotify = None
 
 # --- Configuration (must match C++ SMTP server & spool path) ---
 SMTP_SERVER_HOST = "127.0.0.1"
 SMTP_SERVER_PORT = 2525
+# Optional Unix socket of the C++ server, tried before TCP loopback. Opt-in
+# only; point it at a directory other users cannot write to (not /tmp).
+SMTP_SERVER_SOCKET = os.environ.get("SMTP_SERVER_SOCKET") or None
+# Spool layout: mail_spool/<clean_address>/<id>.eml, where clean_address is
+# the recipient with "@", "<" and ">" replaced by "_". Files written flat
+# into mail_spool/ (older C++ server builds) whose name contains
+# clean_address are listed alongside the recipient's directory.
 MAIL_SPOOL_DIR = "mail_spool"
 APP_DOMAIN = "mydomain.com"
 
+# The inbox list only parses headers, read from this many leading bytes
+EML_HEADER_BYTES = 8192
+
+# Recipients whose inbox listing is kept in memory (kept fresh by inotify)
+INBOX_CACHE_ADDRESSES = 1024
+
+# Seconds between keep-alive comments on idle inbox event streams
+INBOX_STREAM_KEEPALIVE = 15
+
+# Concurrent inbox event streams per worker process; beyond this the stream
+# route answers 503 so regular requests always have threads left
+INBOX_STREAM_MAX = 4
+
+# Message-ID suffix, built once instead of per make_msgid() call
+_MSGID_SUFFIX = f"@{APP_DOMAIN}>"
+
+# Characters replaced by "_" when mapping an address to spool names
+_ADDR_TRANS = str.maketrans({"@": "_", "<": "_", ">": "_"})
+
+# Dot-stuffing (RFC 5321): any line beginning with "." gets another "."
+_DOT_STUFF = re.compile(rb"(?m)^\.")
+
 app = Flask(__name__)
 CORS(app)
 
+log = logging.getLogger("smtp")
+
+# Idle keep-alive connections to the C++ SMTP server, as
+# (socket, rfile, pipelining) where pipelining is the EHLO capability
+_SMTP_POOL = queue.Queue(maxsize=8)
+
+# Worker threads used to read/parse spool files in parallel
+_INBOX_POOL = ThreadPoolExecutor(max_workers=8)
+
+
+def _ojson(obj, status=200):
+    """Build a JSON response like flask.jsonify, but encoded with orjson."""
+    return app.response_class(
+        orjson.dumps(obj), status=status, mimetype="application/json"
+    )
+
 
 # =====================================================================
 #                    SMTP CLIENT: PYTHON → C++ SERVER
 # =====================================================================
 
-def send_smtp_message(mail_from: str, rcpt_to_list, raw_message: str) -> bool:
+def _smtp_read_response(rfile) -> str:
+    # Multi-line replies ("250-...") continue until a "250 ..." line
+    lines = []
+    while True:
+        line = rfile.readline()
+        if not line:
+            break
+        lines.append(line.decode("utf-8", errors="ignore").rstrip("\r\n"))
+        if line[3:4] != b"-":
+            break
+    return "\n".join(lines).strip()
+
+
+def _smtp_expect(rfile, cmd: str, expected_code: int) -> str:
+    response = _smtp_read_response(rfile)
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("C: %s | S: %s", cmd, response)
+    if not response.startswith(str(expected_code)):
+        raise Exception(f"SMTP Error (expected {expected_code}): {response}")
+    return response
+
+
+def _smtp_command(conn, cmd: str, expected_code: int) -> str:
+    s, rfile, _ = conn
+    s.sendall(f"{cmd}\r\n".encode("utf-8"))
+    return _smtp_expect(rfile, cmd, expected_code)
+
+
+def _smtp_close(conn, send_quit=False):
+    """Close a pooled connection, optionally saying QUIT first."""
+    s, rfile, _ = conn
+    try:
+        if send_quit:
+            _smtp_command(conn, "QUIT", 221)
+    except Exception:
+        pass
+    finally:
+        rfile.close()
+        s.close()
+
+
+def _smtp_supports_pipelining(ehlo_response: str) -> bool:
+    """True if an EHLO reply advertises the PIPELINING extension (RFC 2920)."""
+    for line in ehlo_response.split("\n"):
+        keywords = line[4:].split()
+        if keywords and keywords[0].upper() == "PIPELINING":
+            return True
+    return False
+
+
+def _smtp_connect():
     """
-    Connect to the C++ SMTP server and send a complete RFC 5322 message.
+    Open a new connection to the C++ SMTP server, over SMTP_SERVER_SOCKET
+    if configured and accepting connections, and TCP otherwise.
     Executes:
         220 Greeting
-        EHLO
-        MAIL FROM
-        RCPT TO (for each recipient)
-        DATA + message
-        .
-        QUIT
+        EHLO  (records whether PIPELINING is advertised)
     """
     s = None
-    try:
+    if SMTP_SERVER_SOCKET:
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        s.settimeout(5)
+        try:
+            s.connect(SMTP_SERVER_SOCKET)
+        except OSError as e:
+            # missing or stale socket file: fall back to TCP
+            log.warning(
+                "[SMTP CLIENT] Cannot connect to %s, using TCP: %s",
+                SMTP_SERVER_SOCKET,
+                e,
+            )
+            s.close()
+            s = None
+    if s is None:
         s = socket.create_connection(
             (SMTP_SERVER_HOST, SMTP_SERVER_PORT), timeout=5
         )
-
-        def read_response() -> str:
-            data = b""
-            while True:
-                chunk = s.recv(1)
-                if not chunk:
-                    break
-                data += chunk
-                if data.endswith(b"\r\n"):
-                    break
-            return data.decode("utf-8", errors="ignore").strip()
-
-        def send_command(cmd: str, expected_code: int) -> str:
-            s.sendall(f"{cmd}\r\n".encode("utf-8"))
-            response = read_response()
-            print(f"C: {cmd} | S: {response}")
-            if not response.startswith(str(expected_code)):
-                raise Exception(f"SMTP Error (expected {expected_code}): {response}")
-            return response
-
-        # 1. Greeting
-        greeting = read_response()
-        print(f"S: {greeting}")
+        s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    conn = (s, s.makefile("rb", buffering=4096), False)
+    try:
+        greeting = _smtp_read_response(conn[1])
+        log.debug("S: %s", greeting)
         if not greeting.startswith("220"):
             raise Exception("Did not receive 220 initial greeting")
 
-        # 2. EHLO
-        send_command(f"EHLO {APP_DOMAIN}", 250)
+        ehlo = _smtp_command(conn, f"EHLO {APP_DOMAIN}", 250)
+        return (conn[0], conn[1], _smtp_supports_pipelining(ehlo))
+    except Exception:
+        _smtp_close(conn)
+        raise
 
-        # 3. MAIL FROM
-        send_command(f"MAIL FROM:<{mail_from}>", 250)
 
-        # 4. RCPT TO
-        for rcpt in rcpt_to_list:
-            send_command(f"RCPT TO:<{rcpt}>", 250)
+def _smtp_acquire():
+    """
+    Take an idle connection from the pool, or open a new one.
+    Pooled connections are checked with RSET (which also clears any
+    leftover transaction state); dead ones are discarded.
+    """
+    while True:
+        try:
+            conn = _SMTP_POOL.get_nowait()
+        except queue.Empty:
+            return _smtp_connect()
+        try:
+            _smtp_command(conn, "RSET", 250)
+            return conn
+        except Exception:
+            _smtp_close(conn)
 
-        # 5. DATA
-        send_command("DATA", 354)
 
-        # Normalize line endings to CRLF
-        data_to_send = raw_message.replace("\r\n", "\n").replace("\n", "\r\n")
+def _smtp_release(conn):
+    """Return a healthy connection to the pool (or QUIT it if the pool is full)."""
+    try:
+        _SMTP_POOL.put_nowait(conn)
+    except queue.Full:
+        _smtp_close(conn, send_quit=True)
 
-        # Dot-stuffing (RFC 5321): lines beginning with "." are prefixed with another "."
-        stuffed_lines = []
-        for line in data_to_send.split("\r\n"):
-            if line.startswith("."):
-                stuffed_lines.append("." + line)
-            else:
-                stuffed_lines.append(line)
-        stuffed_data = "\r\n".join(stuffed_lines) + "\r\n"
+
+def _smtp_payload(raw_message: bytes) -> bytes:
+    """Dot-stuff a CRLF-normalized message and make sure it ends in CRLF."""
+    raw = _DOT_STUFF.sub(b"..", raw_message)
+    if not raw.endswith(b"\r\n"):
+        raw += b"\r\n"
+    return raw
+
+
+def send_smtp_message(mail_from: str, rcpt_to_list, raw_message: bytes) -> bool:
+    """
+    Send a complete RFC 5322 message over a pooled connection to the C++
+    SMTP server. raw_message must already use CRLF line endings
+    (e.g. policy.SMTP).
+    Executes:
+        MAIL FROM, RCPT TO (for each recipient), DATA
+            (pipelined if the server advertised PIPELINING)
+        message
+        .
+    The connection is returned to the pool on success and closed on error.
+    """
+    conn = None
+    try:
+        conn = _smtp_acquire()
+        s, rfile, pipelining = conn
+
+        envelope = (
+            [(f"MAIL FROM:<{mail_from}>", 250)]
+            + [(f"RCPT TO:<{rcpt}>", 250) for rcpt in rcpt_to_list]
+            + [("DATA", 354)]
+        )
+        if pipelining:
+            # RFC 2920: one write, then the replies are read in order
+            s.sendall("".join(f"{cmd}\r\n" for cmd, _ in envelope).encode("utf-8"))
+            for cmd, expected_code in envelope:
+                _smtp_expect(rfile, cmd, expected_code)
+        else:
+            for cmd, expected_code in envelope:
+                _smtp_command(conn, cmd, expected_code)
 
         # Send DATA block
-        s.sendall(stuffed_data.encode("utf-8"))
+        s.sendall(_smtp_payload(raw_message))
 
         # End of DATA
-        send_command(".", 250)
+        _smtp_command(conn, ".", 250)
+
+        _smtp_release(conn)
+        return True
 
-        # QUIT
-        send_command("QUIT", 221)
+    except Exception as e:
+        log.warning("[SMTP CLIENT] Error during SMTP conversation: %s", e)
+        if conn:
+            _smtp_close(conn)
+        return False
 
+
+def send_smtp_message_single(mail_from: str, rcpt: str, raw_message: bytes) -> bool:
+    """
+    send_smtp_message() specialized for exactly one recipient, the only
+    shape /api/send produces. Same protocol, but with a fixed envelope
+    (pipelined if the server advertised PIPELINING) and the end-of-data "."
+    sent in the same write as the message.
+    """
+    conn = None
+    try:
+        conn = _smtp_acquire()
+        s, rfile, pipelining = conn
+
+        if pipelining:
+            s.sendall(
+                (
+                    f"MAIL FROM:<{mail_from}>\r\n"
+                    f"RCPT TO:<{rcpt}>\r\n"
+                    "DATA\r\n"
+                ).encode("utf-8")
+            )
+            _smtp_expect(rfile, "MAIL FROM", 250)
+            _smtp_expect(rfile, "RCPT TO", 250)
+            _smtp_expect(rfile, "DATA", 354)
+        else:
+            _smtp_command(conn, f"MAIL FROM:<{mail_from}>", 250)
+            _smtp_command(conn, f"RCPT TO:<{rcpt}>", 250)
+            _smtp_command(conn, "DATA", 354)
+
+        s.sendall(_smtp_payload(raw_message) + b".\r\n")
+        _smtp_expect(rfile, ".", 250)
+
+        _smtp_release(conn)
         return True
 
     except Exception as e:
-        print(f"[SMTP CLIENT] Error during SMTP conversation: {e}")
+        log.warning("[SMTP CLIENT] Error during SMTP conversation: %s", e)
+        if conn:
+            _smtp_close(conn)
         return False
-    finally:
-        if s:
-            s.close()
+
+
+def fast_msgid() -> str:
+    """Unique Message-ID: nanosecond timestamp plus 48 random bits."""
+    return f"<{time.time_ns():x}.{secrets.token_hex(6)}{_MSGID_SUFFIX}"
 
 
 # =====================================================================
@@ -133,9 +330,9 @@ def handle_new_mailbox():
     Returns:
         { "email": "abcd1234@mydomain.com" }
     """
-    alias = uuid.uuid4().hex[:8]  # 8-char random mailbox
+    alias = secrets.token_hex(4)  # 8-char random mailbox
     email = f"{alias}@{APP_DOMAIN}"
-    return jsonify({"email": email}), 200
+    return _ojson({"email": email})
 
 
 @app.route("/api/send", methods=["POST"])
@@ -160,110 +357,532 @@ def handle_send_mail():
     body = data.get("body")
 
     if not sender or not recipient or not subject or not body:
-        return (
-            jsonify(
-                {"status": "error", "message": "from, rcpt_to, subject, body are required"}
-            ),
+        return _ojson(
+            {"status": "error", "message": "from, rcpt_to, subject, body are required"},
             400,
         )
 
     # OPTIONAL restriction: only allow local disposable recipients
     # if not recipient.endswith(f"@{APP_DOMAIN}"):
-    #     return jsonify({"status": "error",
-    #                     "message": f"Recipient must be under @{APP_DOMAIN}"}), 400
+    #     return _ojson({"status": "error",
+    #                    "message": f"Recipient must be under @{APP_DOMAIN}"}, 400)
 
     # Build a proper RFC 5322 email
     msg = EmailMessage()
     msg["From"] = sender  # only address, no display name
     msg["To"] = recipient
     msg["Subject"] = subject
-    msg["Date"] = formatdate(localtime=True)
-    msg["Message-ID"] = make_msgid(domain=APP_DOMAIN)
+    msg["Date"] = format_datetime(datetime.now(timezone.utc))
+    msg["Message-ID"] = fast_msgid()
     msg["MIME-Version"] = "1.0"
     msg.set_content(body)  # text/plain; charset="utf-8"
 
-    raw_message = msg.as_string()
+    # policy.SMTP emits CRLF line endings, ready for the DATA phase
+    raw_message = msg.as_bytes(policy=policy.SMTP)
 
-    success = send_smtp_message(sender, [recipient], raw_message)
+    success = send_smtp_message_single(sender, recipient, raw_message)
 
     if success:
-        return (
-            jsonify({"status": "success", "message": "Email queued for delivery"}),
-            200,
-        )
+        return _ojson({"status": "success", "message": "Email queued for delivery"})
     else:
-        return (
-            jsonify(
-                {
-                    "status": "error",
-                    "message": "SMTP server connection failed or protocol error",
-                }
-            ),
+        return _ojson(
+            {
+                "status": "error",
+                "message": "SMTP server connection failed or protocol error",
+            },
             500,
         )
 
 
+def _clean_address(user_address):
+    """
+    Sanitize an email address for use in spool file/directory names.
+    Returns None for values that are not a single path component (empty,
+    ".", "..", or containing a separator), which must not be listed.
+    """
+    clean_address = user_address.translate(_ADDR_TRANS)
+    if (
+        clean_address in ("", ".", "..")
+        or "/" in clean_address
+        or "\\" in clean_address
+        or "\0" in clean_address
+    ):
+        return None
+    return clean_address
+
+
+@lru_cache(maxsize=4096)
+def _parsed_headers(filename, mtime_ns, size):
+    """
+    Parse the headers of one spooled .eml file into the inbox list shape.
+    Only the first EML_HEADER_BYTES are read; the body is left for
+    /api/message. Spool files are written once, so (path, mtime, size)
+    identifies the content; a rewritten file gets a new key and the old
+    entry ages out. The returned dict is shared and must not be mutated.
+    """
+    with open(filename, "rb") as f:
+        raw = f.read(EML_HEADER_BYTES)
+
+    # be tolerant to any accidental leading blank lines
+    raw = raw.lstrip(b"\r\n")
+
+    msg = BytesHeaderParser(policy=policy.default).parsebytes(raw)
+
+    return {
+        "id": os.path.basename(filename),
+        "from": msg.get("From", "Unknown Sender"),
+        "subject": msg.get("Subject", "No Subject"),
+        "date": msg.get("Date", "Unknown Date"),
+    }
+
+
+def _load_eml(filename):
+    """
+    Return the inbox list entry for a spooled .eml file, or None if
+    the file cannot be read or parsed.
+    """
+    try:
+        st = os.stat(filename)
+        return _parsed_headers(filename, st.st_mtime_ns, st.st_size)
+    except Exception as e:
+        log.warning("[INBOX] Error reading/parsing file %s: %s", filename, e)
+        return None
+
+
+def _parse_full_eml(filename):
+    """
+    Fully parse one spooled .eml file, including its text/plain body.
+    The file is fed to the parser in chunks rather than read into one
+    bytes object first.
+    """
+    with open(filename, "rb") as f:
+        # be tolerant to any accidental leading blank lines
+        while f.peek(1)[:1] in (b"\r", b"\n"):
+            f.read(1)
+
+        msg = BytesParser(policy=policy.default).parse(f)
+
+    # Extract text/plain body
+    if msg.is_multipart():
+        part = msg.get_body(preferencelist=("plain",))
+        body_content = part.get_content() if part else ""
+    else:
+        body_content = msg.get_content()
+
+    return {
+        "id": os.path.basename(filename),
+        "from": msg.get("From", "Unknown Sender"),
+        "subject": msg.get("Subject", "No Subject"),
+        "date": msg.get("Date", "Unknown Date"),
+        "body": (body_content or "").strip(),
+    }
+
+
+def _inbox_files(clean_address):
+    """
+    Return the paths of all spooled .eml files for one recipient: the
+    contents of its per-recipient directory plus any legacy flat-layout
+    files in the spool root that carry its address.
+    """
+    inbox_files = []
+
+    user_dir = os.path.join(MAIL_SPOOL_DIR, clean_address)
+    if os.path.isdir(user_dir):
+        inbox_files = [
+            os.path.join(user_dir, name)
+            for name in os.listdir(user_dir)
+            if name.endswith(".eml")
+        ]
+
+    # legacy flat layout: plain substring match (no fnmatch/regex per entry)
+    try:
+        with os.scandir(MAIL_SPOOL_DIR) as it:
+            inbox_files += [
+                e.path
+                for e in it
+                if e.name.endswith(".eml")
+                and clean_address in e.name
+                and e.is_file()
+            ]
+    except FileNotFoundError:
+        pass
+
+    return inbox_files
+
+
+def _message_file(clean_address, message_id):
+    """
+    Resolve a message id from the inbox list to its spool path, or None.
+    Ids are plain file names, so anything containing a path separator is
+    rejected, and the resolved file must sit directly in the recipient's
+    directory (or, for the legacy flat layout, the spool root).
+    """
+    if not message_id.endswith(".eml") or os.path.basename(message_id) != message_id:
+        return None
+
+    spool_dir = os.path.realpath(MAIL_SPOOL_DIR)
+    user_dir = os.path.join(spool_dir, clean_address)
+
+    user_file = os.path.realpath(os.path.join(user_dir, message_id))
+    if os.path.dirname(user_file) == user_dir and os.path.isfile(user_file):
+        return user_file
+
+    # legacy flat layout
+    flat_file = os.path.realpath(os.path.join(spool_dir, message_id))
+    if (
+        clean_address in message_id
+        and os.path.dirname(flat_file) == spool_dir
+        and os.path.isfile(flat_file)
+    ):
+        return flat_file
+    return None
+
+
 @app.route("/api/inbox/<user_address>", methods=["GET"])
 def handle_get_inbox(user_address):
     """
-    Return all messages for a given email address as JSON.
+    Return the message list (id, from, subject, date) for a given email
+    address as JSON. Bodies are fetched per message from /api/message.
 
     URL example:
         GET /api/inbox/abcd1234@mydomain.com
     """
-    # sanitize for filename pattern
-    clean_address = (
-        user_address.replace("@", "_").replace("<", "_").replace(">", "_")
+    clean_address = _clean_address(user_address)
+    if clean_address is None:
+        return _ojson({"status": "error", "message": "Invalid address"}, 400)
+
+    messages = _cached_inbox(clean_address)
+    if messages is None:
+        generation = _spool_generation
+        inbox_files = _inbox_files(clean_address)
+        messages = [m for m in _INBOX_POOL.map(_load_eml, inbox_files) if m]
+        _store_inbox(clean_address, messages, generation)
+
+    return _ojson(messages)
+
+
+@app.route("/api/inbox_stream/<user_address>", methods=["GET"])
+def handle_inbox_stream(user_address):
+    """
+    Server-Sent Events stream of new messages for a given email address.
+    Each event's data is one inbox list entry (same shape as /api/inbox);
+    an entry may occasionally be sent twice, so clients dedupe by id.
+    Requires the inotify spool watcher (Linux).
+
+    URL example:
+        GET /api/inbox_stream/abcd1234@mydomain.com
+    """
+    if not _spool_watcher_running:
+        return _ojson(
+            {"status": "error", "message": "Inbox streaming is not available"},
+            503,
+        )
+
+    clean_address = _clean_address(user_address)
+    if clean_address is None:
+        return _ojson({"status": "error", "message": "Invalid address"}, 400)
+    if clean_address in _unwatched_addresses:
+        return _ojson(
+            {"status": "error", "message": "Inbox streaming is not available"},
+            503,
+        )
+
+    global _inbox_stream_count
+
+    events = queue.Queue()
+    with _inbox_lock:
+        if _inbox_stream_count >= INBOX_STREAM_MAX:
+            return _ojson(
+                {"status": "error", "message": "Too many inbox streams"}, 503
+            )
+        _inbox_stream_count += 1
+        _inbox_subscribers.setdefault(clean_address, set()).add(events)
+
+    def unsubscribe():
+        global _inbox_stream_count
+
+        with _inbox_lock:
+            _inbox_stream_count -= 1
+            subscribers = _inbox_subscribers.get(clean_address)
+            if subscribers:
+                subscribers.discard(events)
+                if not subscribers:
+                    del _inbox_subscribers[clean_address]
+
+    def stream():
+        yield ": connected\n\n"
+        while True:
+            try:
+                entry = events.get(timeout=INBOX_STREAM_KEEPALIVE)
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+                continue
+            yield b"data: " + orjson.dumps(entry) + b"\n\n"
+
+    response = Response(
+        stream(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
+    # runs when the server closes the response, even if it never started
+    response.call_on_close(unsubscribe)
+    return response
+
 
-    search_pattern = f"*{clean_address}*.eml"
-    inbox_files = glob.glob(os.path.join(MAIL_SPOOL_DIR, search_pattern))
+@app.route("/api/message/<user_address>/<message_id>", methods=["GET"])
+def handle_get_message(user_address, message_id):
+    """
+    Return one fully parsed message (including body) as JSON.
+
+    URL example:
+        GET /api/message/abcd1234@mydomain.com/<id from /api/inbox>
+    """
+    clean_address = _clean_address(user_address)
+    if clean_address is None:
+        return _ojson({"status": "error", "message": "Invalid address"}, 400)
+
+    filename = _message_file(clean_address, message_id)
+    if not filename:
+        return _ojson({"status": "error", "message": "Message not found"}, 404)
 
-    messages = []
+    try:
+        message = _parse_full_eml(filename)
+    except Exception as e:
+        log.warning("[INBOX] Error reading/parsing file %s: %s", filename, e)
+        return _ojson({"status": "error", "message": "Could not read message"}, 500)
+
+    return _ojson(message)
 
-    for filename in inbox_files:
+
+# =====================================================================
+#                 SPOOL WATCHER: INOTIFY → INBOX CACHE/SSE
+# =====================================================================
+#
+# With inotify available, a background thread watches the spool (and each
+# per-recipient directory). Inbox listings are cached per recipient and
+# only rebuilt after a delivery/removal touches that recipient, and new
+# messages are pushed to /api/inbox_stream subscribers.
+
+_inbox_lock = threading.Lock()
+_inbox_cache = OrderedDict()  # clean_address -> inbox list (LRU order)
+_inbox_subscribers = {}  # clean_address -> set of queue.Queue
+_inbox_stream_count = 0  # open /api/inbox_stream responses in this process
+_spool_generation = 0  # bumped on every spool change
+_spool_watcher_running = False
+# per-recipient directories inotify could not watch (e.g. max_user_watches
+# reached); their listings are never cached and they cannot be streamed
+_unwatched_addresses = set()
+
+
+def _cached_inbox(clean_address):
+    """Return the cached inbox listing for a recipient, or None."""
+    if not _spool_watcher_running or clean_address in _unwatched_addresses:
+        return None
+    with _inbox_lock:
+        messages = _inbox_cache.get(clean_address)
+        if messages is not None:
+            _inbox_cache.move_to_end(clean_address)
+        return messages
+
+
+def _store_inbox(clean_address, messages, generation):
+    """
+    Cache a freshly scanned listing, unless the spool changed since
+    `generation` was read (the scan may have missed that change).
+    """
+    if not _spool_watcher_running:
+        return
+    with _inbox_lock:
+        if generation != _spool_generation or clean_address in _unwatched_addresses:
+            return
+        _inbox_cache[clean_address] = messages
+        _inbox_cache.move_to_end(clean_address)
+        while len(_inbox_cache) > INBOX_CACHE_ADDRESSES:
+            _inbox_cache.popitem(last=False)
+
+
+def _spool_changed(user_dir, name, delivered):
+    """Invalidate affected listings and notify subscribers of a new .eml."""
+    global _spool_generation
+
+    with _inbox_lock:
+        _spool_generation += 1
+        if user_dir is not None:
+            addresses = [user_dir]
+        else:
+            # legacy flat layout: same substring match as _inbox_files
+            known = set(_inbox_cache) | set(_inbox_subscribers)
+            addresses = [a for a in known if a in name]
+        for address in addresses:
+            _inbox_cache.pop(address, None)
+        subscribers = [
+            q for a in addresses for q in _inbox_subscribers.get(a, ())
+        ]
+
+    if delivered and subscribers:
+        if user_dir is not None:
+            path = os.path.join(MAIL_SPOOL_DIR, user_dir, name)
+        else:
+            path = os.path.join(MAIL_SPOOL_DIR, name)
+        entry = _load_eml(path)
+        if entry:
+            for q in subscribers:
+                q.put(entry)
+
+
+def _watch_user_dir(inotify, mask, watches, name):
+    """
+    Add an inotify watch on one per-recipient directory. On failure the
+    address is invalidated and excluded from caching, since changes to it
+    would go unnoticed. Returns True if the directory is now watched.
+    """
+    global _spool_generation
+
+    path = os.path.join(MAIL_SPOOL_DIR, name)
+    try:
+        wd = inotify.add_watch(path, mask)
+    except OSError as e:
+        log.warning("[INBOX] Cannot watch %s, not caching it: %s", path, e)
+        with _inbox_lock:
+            _unwatched_addresses.add(name)
+            _inbox_cache.pop(name, None)
+            _spool_generation += 1
+        return False
+
+    watches[wd] = name
+    with _inbox_lock:
+        _unwatched_addresses.discard(name)
+    return True
+
+
+def _reset_inbox_cache():
+    """Drop every cached listing, e.g. after inotify events were lost."""
+    global _spool_generation
+
+    with _inbox_lock:
+        _inbox_cache.clear()
+        _spool_generation += 1
+
+
+def _run_spool_watcher(inotify, mask, watches):
+    """
+    Thread entry point. If the watcher dies, caching is switched off so
+    that /api/inbox goes back to scanning instead of serving stale lists.
+    """
+    global _spool_watcher_running
+
+    try:
+        _watch_spool(inotify, mask, watches)
+    except Exception:
+        log.exception("[INBOX] Spool watcher stopped, polling the spool instead")
+        _spool_watcher_running = False
+        _reset_inbox_cache()
+
+
+def _unwatch_user_dir(inotify, watches, name):
+    """Forget the watch on a per-recipient directory that left the spool."""
+    for wd in [wd for wd, d in watches.items() if d == name]:
+        del watches[wd]
         try:
-            with open(filename, "rb") as f:
-                raw = f.read()
-
-            # be tolerant to any accidental leading blank lines
-            raw = raw.lstrip(b"\r\n")
-
-            msg = BytesParser(policy=policy.default).parsebytes(raw)
-
-            # Extract text/plain body
-            if msg.is_multipart():
-                part = msg.get_body(preferencelist=("plain",))
-                body_content = part.get_content() if part else ""
-            else:
-                body_content = msg.get_content()
-
-            messages.append(
-                {
-                    "id": os.path.basename(filename),
-                    "from": msg.get("From", "Unknown Sender"),
-                    "subject": msg.get("Subject", "No Subject"),
-                    "date": msg.get("Date", "Unknown Date"),
-                    "body": (body_content or "").strip(),
-                }
+            inotify.rm_watch(wd)
+        except OSError:
+            pass  # already gone (directory deleted)
+    with _inbox_lock:
+        _unwatched_addresses.discard(name)
+
+
+def _watch_spool(inotify, mask, watches):
+    """Background loop: translate inotify events into _spool_changed calls."""
+    while True:
+        for event in inotify.read():
+            if event.mask & inotify_flags.Q_OVERFLOW:
+                # events were dropped; no listing can be trusted any more
+                log.warning("[INBOX] inotify queue overflowed, dropping inbox cache")
+                _reset_inbox_cache()
+                continue
+
+            user_dir = watches.get(event.wd)
+            if user_dir is None:
+                continue
+
+            if event.mask & inotify_flags.ISDIR:
+                # new per-recipient directory under the spool root
+                if user_dir == "" and event.mask & (
+                    inotify_flags.CREATE | inotify_flags.MOVED_TO
+                ):
+                    if not _watch_user_dir(inotify, mask, watches, event.name):
+                        continue
+                    path = os.path.join(MAIL_SPOOL_DIR, event.name)
+                    try:
+                        # mail may have landed before the watch existed
+                        early = [n for n in os.listdir(path) if n.endswith(".eml")]
+                    except OSError:
+                        early = []
+                    _spool_changed(event.name, "", delivered=False)
+                    for name in early:
+                        _spool_changed(event.name, name, delivered=True)
+                # per-recipient directory removed or moved out of the spool
+                elif user_dir == "" and event.mask & (
+                    inotify_flags.DELETE | inotify_flags.MOVED_FROM
+                ):
+                    _unwatch_user_dir(inotify, watches, event.name)
+                    _spool_changed(event.name, "", delivered=False)
+                continue
+
+            # files are only interesting once fully written, or removed
+            if event.mask & inotify_flags.CREATE or not event.name.endswith(".eml"):
+                continue
+            delivered = bool(
+                event.mask & (inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO)
             )
-        except Exception as e:
-            print(f"[INBOX] Error reading/parsing file {filename}: {e}")
+            _spool_changed(user_dir or None, event.name, delivered)
 
-    return jsonify(messages), 200
+
+def _start_spool_watcher():
+    """Start the inotify watcher thread, if inotify is available."""
+    global _spool_watcher_running
+
+    if INotify is None:
+        return
+    try:
+        inotify = INotify()
+        mask = (
+            inotify_flags.CREATE
+            | inotify_flags.CLOSE_WRITE
+            | inotify_flags.MOVED_TO
+            | inotify_flags.DELETE
+            | inotify_flags.MOVED_FROM
+        )
+        # wd -> per-recipient directory name ("" for the spool root)
+        watches = {inotify.add_watch(MAIL_SPOOL_DIR, mask): ""}
+        with os.scandir(MAIL_SPOOL_DIR) as it:
+            for e in it:
+                if e.is_dir():
+                    _watch_user_dir(inotify, mask, watches, e.name)
+    except OSError as e:
+        log.warning("[INBOX] inotify unavailable, polling the spool instead: %s", e)
+        return
+
+    threading.Thread(
+        target=_run_spool_watcher, args=(inotify, mask, watches), daemon=True
+    ).start()
+    _spool_watcher_running = True
 
 
 # =====================================================================
 #                              MAIN
 # =====================================================================
 
-if __name__ == "__main__":
-    # Make sure the spool directory exists
-    if not os.path.exists(MAIL_SPOOL_DIR):
-        os.makedirs(MAIL_SPOOL_DIR)
+# Make sure the spool directory exists (also when imported by gunicorn)
+os.makedirs(MAIL_SPOOL_DIR, exist_ok=True)
+_start_spool_watcher()
 
-    print(
-        f"Disposable Email API starting. "
-        f"Target SMTP: {SMTP_SERVER_HOST}:{SMTP_SERVER_PORT}"
+if __name__ == "__main__":
+    # Local development only; serve with gunicorn (see top of file) otherwise
+    logging.basicConfig(level=logging.INFO)
+    log.info(
+        "Disposable Email API starting. Target SMTP: %s:%s",
+        SMTP_SERVER_HOST,
+        SMTP_SERVER_PORT,
     )
-    app.run(host="0.0.0.0", port=8000, debug=True)
+    app.run(host="0.0.0.0", port=8000, debug=False, threaded=True)
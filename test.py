@@ -60,10 +60,20 @@ def get_inbox(user_address):
         print("Subject:", msg.get("subject"))
         print("Date   :", msg.get("date"))
         print("Body   :")
-        print(msg.get("body"))
+        print(get_message(user_address, msg.get("id")).get("body"))
         print("-------------------------")
 
 
+def get_message(user_address, message_id):
+    # The inbox list only carries headers; the body is fetched per message
+    r = requests.get(f"{BASE_URL}/api/message/{user_address}/{message_id}")
+    try:
+        return r.json()
+    except Exception:
+        print("Failed to decode JSON:", r.text)
+        return {}
+
+
 if __name__ == "__main__":
     # Make sure your C++ SMTP server is running first
     # Then start server.py, and finally run this test script.